@@ -13,22 +13,58 @@
 #  limitations under the License.
 
 import ast
+import hashlib
 import os
+import pickle
 import sys
 
 import autopep8
 
-from .flows import flows
+from . import flows
 
+# bump when the CFG layout changes so stale cached objects are ignored
+_CACHE_VERSION = "1"
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "py2flows")
 
-def construct_CFG(file_path) -> flows.CFG:
+
+def _parse(source: str) -> ast.Module:
+    # The CFG builder never reads end positions or type comments; dropping
+    # them shrinks every node's __dict__ before the walk starts.
+    tree = ast.parse(source, type_comments=False)
+    for node in ast.walk(tree):
+        node_dict = node.__dict__
+        node_dict.pop("end_lineno", None)
+        node_dict.pop("end_col_offset", None)
+        node_dict.pop("type_comment", None)
+    return tree
+
+
+def construct_CFG(file_path, use_cache: bool = False) -> flows.CFG:
     with open(file_path) as handler:
         source = autopep8.fix_code(handler.read())
+
+    base_name = os.path.basename(file_path)
+
+    cfg = None
+    cache_path = None
+    if use_cache:
+        key = hashlib.blake2b((_CACHE_VERSION + source).encode()).hexdigest()
+        cache_path = os.path.join(_CACHE_DIR, key + ".pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as cached:
+                cfg = pickle.load(cached)
+
+    if cfg is None:
         visitor = flows.CFGVisitor()
-        base_name = os.path.basename(file_path)
-        cfg = visitor.build(base_name, ast.parse(source))
-        if sys.open_graph:
-            left_base_name = base_name.partition(".")[0]
-            cfg.show(name=left_base_name)
+        cfg = visitor.build(base_name, _parse(source))
+
+        if cache_path is not None:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            with open(cache_path, "wb") as cached:
+                pickle.dump(cfg, cached)
+
+    if sys.open_graph:
+        left_base_name = base_name.partition(".")[0]
+        cfg.show(name=left_base_name)
 
-        return cfg
+    return cfg
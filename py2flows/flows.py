@@ -15,15 +15,71 @@
 from __future__ import annotations
 
 import ast
-from collections import defaultdict
-from typing import Dict, List, Tuple, Set, Optional, Any
+from collections import defaultdict, deque
+from typing import Dict, List, Tuple, Set, Optional, Any, TYPE_CHECKING
 
-import astor
-import graphviz as gv
+try:
+    # ast.unparse (Python >= 3.9) is considerably faster than astor
+    from ast import unparse as _unparse
+
+    def _to_source(node: ast.AST) -> str:
+        try:
+            # match astor's convention of a trailing newline
+            return _unparse(node) + "\n"
+        except AttributeError:
+            # nodes synthesized by the visitor lack the lineno/type_comment
+            # fields ast.unparse touches; astor tolerates their absence
+            import astor
+
+            return astor.to_source(node)
+
+except ImportError:
+    from astor import to_source as _to_source
+
+if TYPE_CHECKING:
+    # imported lazily inside CFG.generate at runtime
+    import graphviz as gv
 
 VisitedExprRes = Tuple[List, List]
 DecomposedExprRes = Tuple[List, ast.Name, List]
 
+# shared marker statement used for the synthetic entry/exit and try
+# scaffolding blocks; these blocks only ever read the node, never mutate it
+_PASS_STMT = ast.Pass()
+
+# fixed read-only name reused by every lowered assert
+_ASSERTION_ERROR_NAME = ast.Name(id="AssertionError", ctx=ast.Load())
+
+# single expression-context instances shared by every synthesized node;
+# contexts carry no state, so one of each suffices
+_LOAD = ast.Load()
+_STORE = ast.Store()
+
+# read-only builtin names shared by every lowered statement that calls them;
+# they only ever appear in Load position and are never mutated
+_ITER_NAME = ast.Name(id="iter", ctx=ast.Load())
+_NEXT_NAME = ast.Name(id="next", ctx=ast.Load())
+_TYPE_NAME = ast.Name(id="type", ctx=ast.Load())
+_DICT_NAME = ast.Name(id="dict", ctx=ast.Load())
+_SET_NAME = ast.Name(id="set", ctx=ast.Load())
+_LIST_NAME = ast.Name(id="list", ctx=ast.Load())
+_TUPLE_NAME = ast.Name(id="tuple", ctx=ast.Load())
+
+# compound statements whose source we truncate to the header line when
+# rendering a block
+_HEADER_STMT_TYPES = frozenset(
+    {
+        ast.If,
+        ast.For,
+        ast.Try,
+        ast.While,
+        ast.With,
+        ast.FunctionDef,
+        ast.ClassDef,
+        ast.ExceptHandler,
+    }
+)
+
 
 class TempVariableName:
     counter = 0
@@ -49,50 +105,52 @@ class BlockId:
 
 
 class BasicBlock:
+    __slots__ = ("bid", "stmt", "_code_cache", "prev", "next")
+
     def __init__(self, bid: int):
         self.bid: int = bid
         self.stmt = []
-        self.prev: List[int] = []
-        self.next: List[int] = []
+        self._code_cache: Optional[str] = None
+        # insertion-ordered dicts used as sets: iteration order is stable
+        # and membership tests and removals are O(1)
+        self.prev: Dict[int, None] = {}
+        self.next: Dict[int, None] = {}
 
     def is_empty(self) -> bool:
         return len(self.stmt) == 0
 
     def has_next(self) -> bool:
-        return len(self.next) != 0
+        return bool(self.next)
 
     def has_previous(self) -> bool:
-        return len(self.prev) != 0
+        return bool(self.prev)
 
     def remove_from_prev(self, prev_bid: int) -> None:
-        if prev_bid in self.prev:
-            self.prev.remove(prev_bid)
+        self.prev.pop(prev_bid, None)
 
     def remove_from_next(self, next_bid: int) -> None:
-        if next_bid in self.next:
-            self.next.remove(next_bid)
+        self.next.pop(next_bid, None)
 
     def stmt_to_code(self) -> str:
+        if self._code_cache is not None:
+            return self._code_cache
         code = str(self.bid) + "\n"
         for stmt in self.stmt:
-            line = astor.to_source(stmt)
+            # call/return/dummy blocks share statement nodes, so cache the
+            # serialized source on the node itself
+            line = getattr(stmt, "_src_cache", None)
+            if line is None:
+                line = _to_source(stmt)
+                try:
+                    stmt._src_cache = line
+                except AttributeError:
+                    pass
             code += (
-                line.split("\n")[0] + "\n"
-                if isinstance(
-                    stmt,
-                    (
-                        ast.If,
-                        ast.For,
-                        ast.Try,
-                        ast.While,
-                        ast.With,
-                        ast.FunctionDef,
-                        ast.ClassDef,
-                        ast.excepthandler,
-                    ),
-                )
+                line[: line.index("\n") + 1]
+                if type(stmt) in _HEADER_STMT_TYPES
                 else line
             )
+        self._code_cache = code
         return code
 
     def __str__(self):
@@ -105,6 +163,30 @@ def add_stmt(block: BasicBlock, stmt) -> None:
 
 
 class CFG:
+    __slots__ = (
+        "name",
+        "start_block",
+        "final_block",
+        "sub_cfgs",
+        "blocks",
+        "edges",
+        "_edge_labels",
+        "graph",
+        "flows",
+        "call_return_inter_flows",
+        "classdef_inter_flows",
+        "special_init_inter_flows",
+        "magic_right_inter_flows",
+        "magic_left_inter_flows",
+        "magic_del_inter_flows",
+        "module_entry_labels",
+        "module_exit_labels",
+        "call_labels",
+        "return_labels",
+        "dummy_labels",
+        "is_generator",
+    )
+
     def __init__(self, name: str):
         self.name: str = name
         self.start_block: Optional[BasicBlock] = None
@@ -112,6 +194,7 @@ class CFG:
         self.sub_cfgs: Dict[int, CFG] = {}
         self.blocks: Dict[int, BasicBlock] = {}
         self.edges: Dict[Tuple[int, int], Optional[ast.AST]] = {}
+        self._edge_labels: Dict[Tuple[int, int], str] = {}
         self.graph: Optional[gv.dot.Digraph] = None
 
         self.flows: Set[Tuple[int, int]] = set()
@@ -133,9 +216,19 @@ class CFG:
 
         self.is_generator: bool = False
 
-    def _traverse(self, block: BasicBlock, visited: Set[int] = set()) -> None:
-        if block.bid not in visited:
-            visited.add(block.bid)
+    def _traverse(self, block: BasicBlock, visited: Optional[Dict[int, None]] = None) -> None:
+        # iterate with an explicit worklist so that deep CFGs do not exhaust
+        # the interpreter stack; visited is a dict used as a set, which is
+        # slightly faster for pure membership on CPython
+        if visited is None:
+            visited = {}
+        worklist = deque([block])
+        edges_out: List[Tuple[str, str, str]] = []
+        while worklist:
+            block = worklist.popleft()
+            if block.bid in visited:
+                continue
+            visited[block.bid] = None
             additional = ""
             for id1, id2 in self.classdef_inter_flows:
                 if id1 == block.bid:
@@ -199,21 +292,50 @@ class CFG:
 
             self.graph.node(str(block.bid), label=block.stmt_to_code() + additional)
             for next_bid in block.next:
-                self._traverse(self.blocks[next_bid], visited)
-                self.graph.edge(
-                    str(block.bid),
-                    str(next_bid),
-                    label=astor.to_source(self.edges[(block.bid, next_bid)])
-                    if self.edges[(block.bid, next_bid)]
-                    else "",
-                )
-
-    def generate(self, fmt: str, name: str) -> gv.dot.Digraph:
-        self.graph = gv.Digraph(name="cluster_" + str(self.start_block.bid), format=fmt)
-        self.graph.attr(label=name)
-        self._traverse(self.start_block)
-        for lab, cfg in self.sub_cfgs.items():
-            self.graph.subgraph(cfg.generate(fmt, "CFG at label {}".format(lab)))
+                worklist.append(self.blocks[next_bid])
+                key = (block.bid, next_bid)
+                label = self._edge_labels.get(key)
+                if label is None:
+                    condition = self.edges[key]
+                    label = _to_source(condition) if condition else ""
+                    self._edge_labels[key] = label
+                edges_out.append((str(block.bid), str(next_bid), label))
+
+        # emit the edges after all nodes: the DOT body then grows in two
+        # contiguous runs instead of interleaved appends
+        edge = self.graph.edge
+        for frm, to, label in edges_out:
+            edge(frm, to, label=label)
+
+    def generate(self, fmt: str, name: str, fast_render: bool = False) -> gv.dot.Digraph:
+        # graphviz is only needed when a CFG is actually rendered; import
+        # it here so plain CFG construction does not pay for it
+        import graphviz as gv
+
+        # build the digraph of every (sub-)CFG with an explicit worklist
+        # instead of recursing through arbitrarily nested sub_cfgs
+        order: List[CFG] = []
+        stack: List[Tuple[CFG, str]] = [(self, name)]
+        while stack:
+            cfg, label = stack.pop()
+            order.append(cfg)
+            cfg.graph = gv.Digraph(
+                name="cluster_" + str(cfg.start_block.bid), format=fmt
+            )
+            if fast_render and cfg is self:
+                # cap dot's crossing-minimization iterations; far faster on
+                # big graphs at the cost of a rougher layout
+                cfg.graph.attr(nslimit="5", nslimit1="5")
+            cfg.graph.attr(label=label)
+            cfg._traverse(cfg.start_block)
+            for lab, sub_cfg in cfg.sub_cfgs.items():
+                stack.append((sub_cfg, "CFG at label {}".format(lab)))
+
+        # splice children bottom-up so every subgraph body is copied into
+        # its parent exactly once
+        for cfg in reversed(order):
+            for sub_cfg in cfg.sub_cfgs.values():
+                cfg.graph.subgraph(sub_cfg.graph)
         return self.graph
 
     def show(
@@ -221,8 +343,9 @@ class CFG:
         fmt: str = "svg",
         show: bool = True,
         name: str = None,
+        fast_render: bool = False,
     ) -> None:
-        self.generate(fmt, name)
+        self.generate(fmt, name, fast_render)
         self.graph.render(filename=name, view=show, cleanup=True)
 
 
@@ -243,35 +366,80 @@ class CFGVisitor(ast.NodeVisitor):
         # check if a function is a generator function by checking if it has yields
         self.is_generator: bool = False
 
+    # node type -> unbound visit_* method, shared by all instances of the
+    # class and filled lazily on first encounter of each node type
+    _visitor_cache: Dict[type, Any] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # subclasses overriding visit_* methods get their own cache
+        cls._visitor_cache = {}
+
+    def visit(self, node):
+        node_type = type(node)
+        method = self._visitor_cache.get(node_type)
+        if method is None:
+            cls = type(self)
+            method = getattr(cls, "visit_" + node_type.__name__, cls.generic_visit)
+            self._visitor_cache[node_type] = method
+        return method(self, node)
+
+    def generic_visit(self, node):
+        # Walk _fields directly instead of ast.iter_fields, which allocates a
+        # (name, value) tuple per field on every node visited. Only statement
+        # children can contribute blocks or edges, so expression subtrees of
+        # unhandled nodes are not descended into.
+        node_dict = node.__dict__
+        visit = self.visit
+        for field in node._fields:
+            value = node_dict.get(field)
+            if type(value) is list:
+                for child in value:
+                    if isinstance(child, ast.stmt):
+                        visit(child)
+            elif isinstance(value, ast.stmt):
+                visit(value)
+
     def build(self, name: str, tree: ast.Module) -> CFG:
         self.cfg = CFG(name)
         self.curr_block = self.new_block()
         self.visit(tree)
-        self.remove_empty_blocks(self.cfg.start_block, set())
+        self.remove_empty_blocks(self.cfg.start_block)
+        self.refactor_flows_and_labels()
+        return self.cfg
+
+    def build_body(self, name: str, body: List[ast.stmt]) -> CFG:
+        # like build, but works directly on a statement list so callers do
+        # not have to allocate a throwaway ast.Module wrapper
+        self.cfg = CFG(name)
+        self.curr_block = self.new_block()
+        self._visit_module_body(body)
+        self.remove_empty_blocks(self.cfg.start_block)
         self.refactor_flows_and_labels()
         return self.cfg
 
     def new_block(self) -> BasicBlock:
-        bid: int = BlockId.gen_block_id()
-        self.cfg.blocks[bid] = BasicBlock(bid)
-        return self.cfg.blocks[bid]
+        # bump the counter and insert in one go; block ids stay globally
+        # unique so labels never collide across sub-CFGs
+        BlockId.counter += 1
+        bid: int = BlockId.counter
+        block = self.cfg.blocks[bid] = BasicBlock(bid)
+        return block
 
     def add_edge(self, frm_id: int, to_id: int, condition=None) -> BasicBlock:
-        if to_id in self.cfg.blocks[frm_id].next:
-            pass
-            # assert False, f"{frm_id}, {to_id}"
-        else:
-            self.cfg.blocks[frm_id].next.append(to_id)
-
-        if frm_id in self.cfg.blocks[to_id].prev:
-            pass
-            # assert False, f"{frm_id}, {to_id}"
-        else:
-            self.cfg.blocks[to_id].prev.append(frm_id)
+        self.cfg.blocks[frm_id].next[to_id] = None
+        self.cfg.blocks[to_id].prev[frm_id] = None
 
         self.cfg.edges[(frm_id, to_id)] = condition
         return self.cfg.blocks[to_id]
 
+    def _advance_block(self, condition=None) -> BasicBlock:
+        # wire a fresh block after the current one and make it current
+        new_block = self.new_block()
+        self.add_edge(self.curr_block.bid, new_block.bid, condition)
+        self.curr_block = new_block
+        return new_block
+
     def add_loop_block(self) -> BasicBlock:
         if self.curr_block.is_empty() and not self.curr_block.has_next():
             return self.curr_block
@@ -284,7 +452,7 @@ class CFGVisitor(ast.NodeVisitor):
         visitor: CFGVisitor = CFGVisitor(
             entry_node=self.curr_block.stmt[0].args,
         )
-        func_cfg: CFG = visitor.build(tree.name, ast.Module(body=tree.body))
+        func_cfg: CFG = visitor.build_body(tree.name, tree.body)
 
         if visitor.is_generator:
             func_cfg.is_generator = True
@@ -295,35 +463,48 @@ class CFGVisitor(ast.NodeVisitor):
 
         class_id = self.curr_block.bid
         visitor: CFGVisitor = CFGVisitor()
-        class_cfg: CFG = visitor.build(node.name, ast.Module(body=node.body))
+        class_cfg: CFG = visitor.build_body(node.name, node.body)
         self.cfg.sub_cfgs[class_id] = class_cfg
 
-    def remove_empty_blocks(self, block: BasicBlock, visited: Set[int]) -> None:
-        if block.bid not in visited:
-            visited.add(block.bid)
+    def remove_empty_blocks(self, block: BasicBlock, visited: Optional[Dict[int, None]] = None) -> None:
+        # phase 1: collect the reachable empty blocks with one worklist sweep
+        if visited is None:
+            visited = {}
+        empty_blocks: List[BasicBlock] = []
+        worklist = deque([block])
+        while worklist:
+            block = worklist.popleft()
+            if block.bid in visited:
+                continue
+            visited[block.bid] = None
             if block.is_empty():
-                for prev_bid in list(block.prev):
-                    prev_block = self.cfg.blocks[prev_bid]
-                    for next_bid in list(block.next):
-                        next_block = self.cfg.blocks[next_bid]
-                        self.add_edge(prev_bid, next_bid)
-                        self.cfg.edges.pop((block.bid, next_bid), None)
-                        next_block.remove_from_prev(block.bid)
-                    self.cfg.edges.pop((prev_bid, block.bid), None)
-                    prev_block.remove_from_next(block.bid)
-
-                block.prev.clear()
-                for next_bid in list(block.next):
-                    self.remove_empty_blocks(self.cfg.blocks[next_bid], visited)
-                block.next.clear()
+                empty_blocks.append(block)
+            for next_bid in block.next:
+                worklist.append(self.cfg.blocks[next_bid])
+
+        # phase 2: splice each empty block out exactly once. Processing
+        # order does not matter: splicing one block of a chain updates the
+        # prev/next of its neighbours, so the remaining empties still see
+        # the edges they have to redirect.
+        for block in empty_blocks:
+            # the successor-side cleanup depends only on next_bid, so run it
+            # once per successor rather than once per predecessor pair
+            for prev_bid in block.prev:
+                prev_block = self.cfg.blocks[prev_bid]
+                for next_bid in block.next:
+                    self.add_edge(prev_bid, next_bid)
+                self.cfg.edges.pop((prev_bid, block.bid), None)
+                prev_block.remove_from_next(block.bid)
+            for next_bid in block.next:
+                self.cfg.edges.pop((block.bid, next_bid), None)
+                self.cfg.blocks[next_bid].remove_from_prev(block.bid)
 
-            else:
-                for next_bid in list(block.next):
-                    self.remove_empty_blocks(self.cfg.blocks[next_bid], visited)
+            block.prev.clear()
+            block.next.clear()
 
     def refactor_flows_and_labels(self):
-        for fst_id, snd_id in self.cfg.edges:
-            self.cfg.flows.add((fst_id, snd_id))
+        # edges already holds every (frm, snd) pair; copy it in one go
+        self.cfg.flows.update(self.cfg.edges.keys())
 
         for (
             l1,
@@ -365,28 +546,43 @@ class CFGVisitor(ast.NodeVisitor):
             else ast.BoolOp(op=ast.And(), values=node_list)
         )
 
+    def _comp_test(self, ifs: List[ast.expr]) -> Optional[ast.expr]:
+        # combined filter condition of one comprehension generator, or None
+        # when it has no filters; the 0/1-filter cases are the majority and
+        # short-circuit before any BoolOp is built
+        if not ifs:
+            return None
+        if len(ifs) == 1:
+            return ifs[0]
+        return self.combine_conditions(ifs)
+
     def populate_body(self, body_list):
+        visit = self.visit
         for child in body_list:
-            self.visit(child)
+            visit(child)
 
     def populate_body_to_next_bid(self, body_list, to_bid: int) -> None:
+        visit = self.visit
         for child in body_list:
-            self.visit(child)
+            visit(child)
         if not self.curr_block.next:
             self.add_edge(self.curr_block.bid, to_bid)
 
     def visit_Module(self, node: ast.Module) -> None:
+        self._visit_module_body(node.body)
+
+    def _visit_module_body(self, body: List[ast.stmt]) -> None:
         # pre structure cleaning
         self.cfg.start_block = self.curr_block
         add_stmt(self.cfg.start_block, self.parent_node)
         self.cfg.module_entry_labels.add(self.cfg.start_block.bid)
         self.cfg.final_block = self.new_block()
-        add_stmt(self.cfg.final_block, ast.Pass())
+        add_stmt(self.cfg.final_block, _PASS_STMT)
         # add final label in order to execute pop out frame
         self.cfg.module_exit_labels.add(self.cfg.final_block.bid)
 
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
-        self.generic_visit(node)
+        self._advance_block()
+        self.populate_body(body)
         # re-construct properties
         self._unify_properties()
 
@@ -449,7 +645,7 @@ class CFGVisitor(ast.NodeVisitor):
 
         add_stmt(self.curr_block, node)
         self.add_FuncCFG(node)
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
         self.populate_body(deleted_vars)
 
         self.visit_DecoratorList(node, decorator_list)
@@ -515,7 +711,7 @@ class CFGVisitor(ast.NodeVisitor):
         self.populate_body(seq)
 
         add_stmt(self.curr_block, node)
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
 
         self.populate_body(deleted_vars)
         if self.final_body_entry_stack and self.final_body_exit_stack:
@@ -532,11 +728,9 @@ class CFGVisitor(ast.NodeVisitor):
             decomposed_expr_sequence = decomposed_expr_sequence[:-1]
             self.populate_body(decomposed_expr_sequence)
 
-            if isinstance(target, ast.Name):
+            if type(target) is ast.Name:
                 add_stmt(self.curr_block, delete_node)
-                self.curr_block = self.add_edge(
-                    self.curr_block.bid, self.new_block().bid
-                )
+                self._advance_block()
             else:
                 call_node = self.curr_block
                 add_stmt(call_node, delete_node)
@@ -625,7 +819,7 @@ class CFGVisitor(ast.NodeVisitor):
 
         node.value = init_var
         self.curr_block = deleted_second_var_block
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
 
         # update call return flow
         self.cfg.call_return_inter_flows.add(
@@ -678,14 +872,14 @@ class CFGVisitor(ast.NodeVisitor):
         )
         node.value = temp_return_name
         self.curr_block = dummy_return_node
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
 
         return [ast.Delete(targets=[temp_return_name])]
 
     def _visit_Regular_LHS(self, node: ast.Assign, target):
         tmp_assign = ast.Assign(targets=[target], value=node.value)
         add_stmt(self.curr_block, tmp_assign)
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
         return []
 
     def _visit_Special_LHS(self, node: ast.Assign, target):
@@ -709,11 +903,21 @@ class CFGVisitor(ast.NodeVisitor):
             (call_node.bid, return_node.bid, dummy_return_node.bid)
         )
         self.curr_block = dummy_return_node
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
 
         self.populate_body(resulted_vars)
         return []
 
+    # dispatch assignment targets by exact type instead of chained
+    # isinstance checks
+    _LHS_HANDLERS = {
+        ast.Name: _visit_Regular_LHS,
+        ast.List: _visit_Regular_LHS,
+        ast.Tuple: _visit_Regular_LHS,
+        ast.Subscript: _visit_Special_LHS,
+        ast.Attribute: _visit_Special_LHS,
+    }
+
     def visit_Assign(self, node: ast.Assign) -> None:
         # desugar xxx = yyy to simpler form
         new_expr_sequence, deleted_vars = self.visit(node.value)
@@ -721,7 +925,7 @@ class CFGVisitor(ast.NodeVisitor):
         # now xxx = yyy
         self.populate_body(prev_expr_sequence)
 
-        if isinstance(node.value, ast.Call):
+        if type(node.value) is ast.Call:
             right_deleted_vars = self._visit_Call(node)
         else:
             right_deleted_vars = self._visit_NonCall(node)
@@ -729,20 +933,19 @@ class CFGVisitor(ast.NodeVisitor):
         self.populate_body(deleted_vars)
 
         for target in node.targets:
-            if isinstance(target, (ast.Name, ast.List, ast.Tuple)):
-                left_deleted_vars = self._visit_Regular_LHS(node, target)
-            elif isinstance(target, (ast.Subscript, ast.Attribute)):
-                left_deleted_vars = self._visit_Special_LHS(node, target)
+            handler = self._LHS_HANDLERS.get(type(target))
+            if handler is not None:
+                left_deleted_vars = handler(self, node, target)
 
         # now assignment gets xxx = a_name
-        # self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        # self._advance_block()
         for right_deleted_var in right_deleted_vars:
             add_stmt(self.curr_block, right_deleted_var)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
         for left_deleted_var in left_deleted_vars:
             add_stmt(self.curr_block, left_deleted_var)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
     def visit_AugAssign(self, node: ast.AugAssign) -> None:
         # We are only interested in types, so transform AugAssign into Assign
@@ -760,7 +963,7 @@ class CFGVisitor(ast.NodeVisitor):
 
     def visit_For(self, node: ast.For) -> None:
         iter_call: ast.Call = ast.Call(
-            args=[node.iter], func=ast.Name(id="iter", ctx=ast.Load()), keywords=[]
+            args=[node.iter], func=_ITER_NAME, keywords=[]
         )
         iter_seq, deleted_vars = self.visit(iter_call)
 
@@ -778,7 +981,7 @@ class CFGVisitor(ast.NodeVisitor):
                 ast.Assign(
                     targets=[node.target],
                     value=ast.Call(
-                        func=ast.Name(id="next"), args=[iter_name], keywords=[]
+                        func=_NEXT_NAME, args=[iter_name], keywords=[]
                     ),
                 )
             ]
@@ -816,7 +1019,7 @@ class CFGVisitor(ast.NodeVisitor):
         else:
             or_else_block: BasicBlock = self.new_block()
             self.add_edge(self.curr_block.bid, or_else_block.bid)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
             self.populate_body_to_next_bid(node.body, loop_guard.bid)
 
             self.curr_block = or_else_block
@@ -826,7 +1029,7 @@ class CFGVisitor(ast.NodeVisitor):
         self.curr_block = after_while_block
         for deleted_var in deleted_vars:
             add_stmt(self.curr_block, deleted_var)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
         self.after_loop_stack.pop()
         self.loop_guard_stack.pop()
 
@@ -847,7 +1050,7 @@ class CFGVisitor(ast.NodeVisitor):
 
         # New block for the body of the else if there is an else clause.
         if node.orelse:
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
             # Visit the children in the body of the else to populate the block.
             self.populate_body_to_next_bid(node.orelse, after_if_block.bid)
@@ -861,7 +1064,7 @@ class CFGVisitor(ast.NodeVisitor):
         self.curr_block: BasicBlock = after_if_block
         for deleted_var in deleted_vars:
             add_stmt(self.curr_block, deleted_var)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
     def visit_With(self, node: ast.With) -> None:
         # https: // docs.python.org / zh - cn / 3.12 / reference / compound_stmts.html
@@ -881,7 +1084,7 @@ class CFGVisitor(ast.NodeVisitor):
             )
             manager_type_var = TempVariableName.generate_name_node()
             manager_type_value = ast.Call(
-                func=ast.Name(id="type"), args=[manager_var], keywords=[]
+                func=_TYPE_NAME, args=[manager_var], keywords=[]
             )
             manager_type_assign = ast.Assign(
                 targets=[manager_type_var], value=manager_type_value
@@ -890,14 +1093,14 @@ class CFGVisitor(ast.NodeVisitor):
             enter_value = ast.Attribute(
                 value=manager_type_var,
                 attr="__enter__",
-                ctx=ast.Load(),
+                ctx=_LOAD,
             )
             enter_assign = ast.Assign(targets=[enter_var], value=enter_value)
             exit_var = TempVariableName.generate_name_node()
             exit_value = ast.Attribute(
                 value=manager_type_var,
                 attr="__exit__",
-                ctx=ast.Load(),
+                ctx=_LOAD,
             )
             exit_assign = ast.Assign(targets=[exit_var], value=exit_value)
             value_var = TempVariableName.generate_name_node()
@@ -931,8 +1134,7 @@ class CFGVisitor(ast.NodeVisitor):
             return_as_raise = ast.Return(value=None)
             self.visit(return_as_raise)
         else:
-            pass_as_raise = ast.Pass()
-            self.visit(pass_as_raise)
+            self.visit(_PASS_STMT)
 
     def visit_Try(self, node: ast.Try) -> None:
         if not node.orelse:
@@ -940,34 +1142,33 @@ class CFGVisitor(ast.NodeVisitor):
         if not node.finalbody:
             node.finalbody = []
 
+        new_block = self.new_block
+        add_edge = self.add_edge
+
         # stage curr_block
         try_body_entry_block = self.curr_block
-        after_try_block = self.new_block()
+        after_try_block = new_block()
 
         # deal with finalbody
-        final_body_entry_block = self.new_block()
-        add_stmt(final_body_entry_block, ast.Pass())
-        final_body_exit_block = self.new_block()
-        add_stmt(final_body_exit_block, ast.Pass())
-        self.curr_block = self.add_edge(
-            final_body_entry_block.bid, self.new_block().bid
-        )
+        final_body_entry_block = new_block()
+        add_stmt(final_body_entry_block, _PASS_STMT)
+        final_body_exit_block = new_block()
+        add_stmt(final_body_exit_block, _PASS_STMT)
+        self.curr_block = add_edge(final_body_entry_block.bid, new_block().bid)
         self.populate_body_to_next_bid(node.finalbody, final_body_exit_block.bid)
-        self.add_edge(final_body_exit_block.bid, after_try_block.bid)
+        add_edge(final_body_exit_block.bid, after_try_block.bid)
 
         self.final_body_entry_stack.append(final_body_entry_block)
         self.final_body_exit_stack.append(final_body_exit_block)
 
         # deal with orelse
-        orelse_body_entry_block = self.new_block()
-        add_stmt(orelse_body_entry_block, ast.Pass())
-        orelse_body_exit_block = self.new_block()
-        add_stmt(orelse_body_exit_block, ast.Pass())
-        self.curr_block = self.add_edge(
-            orelse_body_entry_block.bid, self.new_block().bid
-        )
+        orelse_body_entry_block = new_block()
+        add_stmt(orelse_body_entry_block, _PASS_STMT)
+        orelse_body_exit_block = new_block()
+        add_stmt(orelse_body_exit_block, _PASS_STMT)
+        self.curr_block = add_edge(orelse_body_entry_block.bid, new_block().bid)
         self.populate_body_to_next_bid(node.orelse, orelse_body_exit_block.bid)
-        self.add_edge(orelse_body_exit_block.bid, final_body_entry_block.bid)
+        add_edge(orelse_body_exit_block.bid, final_body_entry_block.bid)
 
         # deal with try body
         self.curr_block = try_body_entry_block
@@ -983,15 +1184,13 @@ class CFGVisitor(ast.NodeVisitor):
     def visit_Assert(self, node):
         new_if: ast.If = ast.If(
             test=ast.UnaryOp(op=ast.Not(), operand=node.test),
-            body=[
-                ast.Raise(exc=ast.Name(id="AssertionError", ctx=ast.Load()), cause=None)
-            ]
+            body=[ast.Raise(exc=_ASSERTION_ERROR_NAME, cause=None)]
             if node.msg is None
             else [
                 ast.Raise(
                     exc=ast.Call(
                         args=[node.msg],
-                        func=ast.Name(id="AssertionError", ctx=ast.Load()),
+                        func=_ASSERTION_ERROR_NAME,
                         keywords=[],
                     ),
                     cause=None,
@@ -1005,9 +1204,9 @@ class CFGVisitor(ast.NodeVisitor):
         for name in node.names:
             single_import: ast.Import = ast.Import(names=[name])
             add_stmt(self.curr_block, single_import)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
-            add_stmt(self.curr_block, ast.Pass())
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
+            add_stmt(self.curr_block, _PASS_STMT)
+            self._advance_block()
 
     def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
         for name in node.names:
@@ -1015,21 +1214,21 @@ class CFGVisitor(ast.NodeVisitor):
                 module=node.module, names=[name], level=node.level
             )
             add_stmt(self.curr_block, single_importfrom)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
-            add_stmt(self.curr_block, ast.Pass())
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
+            add_stmt(self.curr_block, _PASS_STMT)
+            self._advance_block()
 
     def visit_Global(self, node: ast.Global) -> None:
         for name in node.names:
             single_global = ast.Global(names=[name])
             add_stmt(self.curr_block, single_global)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
     def visit_Nonlocal(self, node: ast.Nonlocal) -> None:
         for name in node.names:
             single_nonlocal = ast.Nonlocal(names=[name])
             add_stmt(self.curr_block, single_nonlocal)
-            self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+            self._advance_block()
 
     def visit_Expr(self, node: ast.Expr) -> None:
 
@@ -1040,7 +1239,7 @@ class CFGVisitor(ast.NodeVisitor):
 
     def visit_Pass(self, node: ast.Pass) -> None:
         add_stmt(self.curr_block, node)
-        self.curr_block = self.add_edge(self.curr_block.bid, self.new_block().bid)
+        self._advance_block()
 
     def visit_Break(self, node: ast.Break) -> None:
         add_stmt(self.curr_block, node)
@@ -1089,8 +1288,14 @@ class CFGVisitor(ast.NodeVisitor):
         if expr is None:
             return [], expr, []
 
+        # fast path for the common case: a bare name needs no decomposition,
+        # so skip the dispatch round trip (visit_Name would hand back
+        # ([expr], []) and we would immediately unpack it again)
+        if type(expr) is ast.Name:
+            return [], expr, []
+
         resulted_sequence, resulted_vars = self.visit(expr)
-        if not isinstance(resulted_sequence[-1], ast.Name):
+        if type(resulted_sequence[-1]) is not ast.Name:
             tmp_var_node = TempVariableName.generate_name_node()
             ast_assign = ast.Assign(
                 targets=[tmp_var_node],
@@ -1126,7 +1331,7 @@ class CFGVisitor(ast.NodeVisitor):
         for assign in reversed(assign_list[:-1]):
             tmp_if = ast.If(
                 test=assign.value
-                if isinstance(node.op, ast.And)
+                if type(node.op) is ast.And
                 else ast.UnaryOp(op=ast.Not(), operand=assign.value),
                 body=current_sequence,
                 orelse=[],
@@ -1167,13 +1372,29 @@ class CFGVisitor(ast.NodeVisitor):
 
     def visit_IfExp(self, node: ast.IfExp) -> VisitedExprRes:
         tmp_name_node = TempVariableName.generate_name_node()
-        new_if: ast.If = ast.If(
-            test=node.test,
-            body=[ast.Assign(targets=[tmp_name_node], value=node.body)],
-            orelse=[ast.Assign(targets=[tmp_name_node], value=node.orelse)],
-        )
 
-        resulted_sequence = [new_if, tmp_name_node]
+        # flatten `a if p else b if q else c` chains here instead of leaving
+        # the nested IfExp inside the orelse assignment, where each level
+        # would cost another visitor round trip and a fresh temp variable
+        tests: List[ast.expr] = []
+        bodies: List[ast.expr] = []
+        cur: ast.expr = node
+        while type(cur) is ast.IfExp:
+            tests.append(cur.test)
+            bodies.append(cur.body)
+            cur = cur.orelse
+
+        orelse: List[ast.stmt] = [ast.Assign(targets=[tmp_name_node], value=cur)]
+        for test, body in zip(reversed(tests), reversed(bodies)):
+            orelse = [
+                ast.If(
+                    test=test,
+                    body=[ast.Assign(targets=[tmp_name_node], value=body)],
+                    orelse=orelse,
+                )
+            ]
+
+        resulted_sequence = orelse + [tmp_name_node]
         resulted_vars = [ast.Delete(targets=[tmp_name_node])]
         return resulted_sequence, resulted_vars
 
@@ -1182,7 +1403,7 @@ class CFGVisitor(ast.NodeVisitor):
         tmp_name_node = TempVariableName.generate_name_node()
         temp_dict_assign = ast.Assign(
             targets=[tmp_name_node],
-            value=ast.Call(func=ast.Name(id="dict"), args=[], keywords=[]),
+            value=ast.Call(func=_DICT_NAME, args=[], keywords=[]),
         )
         seq.append(temp_dict_assign)
         for key, value in zip(node.keys, node.values):
@@ -1201,7 +1422,7 @@ class CFGVisitor(ast.NodeVisitor):
         tmp_name_node = TempVariableName.generate_name_node()
         temp_list_assign = ast.Assign(
             targets=[tmp_name_node],
-            value=ast.Call(func=ast.Name(id="set"), args=[], keywords=[]),
+            value=ast.Call(func=_SET_NAME, args=[], keywords=[]),
         )
         seq.append(temp_list_assign)
         for idx, elt in enumerate(node.elts):
@@ -1226,7 +1447,7 @@ class CFGVisitor(ast.NodeVisitor):
         new_expr_sequence.append(
             ast.Assign(
                 targets=[tmp_name_node],
-                value=ast.List(elts=[], ctx=ast.Load()),
+                value=ast.List(elts=[], ctx=_LOAD),
             )
         )
         new_expr_sequence += self._visit_ListComp(
@@ -1237,45 +1458,52 @@ class CFGVisitor(ast.NodeVisitor):
         resulted_vars = [ast.Delete(targets=[tmp_name_node])]
         return resulted_sequence, resulted_vars
 
-    def _visit_ListComp(
+    def _visit_Comp(
         self,
         tmp_name_node: ast.Name,
         elt: ast.expr,
         generators: List[ast.comprehension],
+        method: str,
     ) -> Any:
-        if not generators:
-            seq, name, vars = self.decompose_expr(elt)
-            tmp_call = ast.Call(
-                func=ast.Attribute(
-                    value=tmp_name_node,
-                    attr="append",
-                    ctx=ast.Load(),
-                ),
-                args=[name],
-                keywords=[],
-            )
-            seq.append(ast.Expr(value=tmp_call))
-            seq.extend(vars)
-            return seq
-        else:
-            return [
+        # shared lowering for list and set comprehensions; method is the
+        # accumulator method, "append" or "add". Build the loop nest
+        # bottom-up: start from the call adding the element and wrap one
+        # For (plus filter If) per generator.
+        seq, name, vars = self.decompose_expr(elt)
+        tmp_call = ast.Call(
+            func=ast.Attribute(
+                value=tmp_name_node,
+                attr=method,
+                ctx=_LOAD,
+            ),
+            args=[name],
+            keywords=[],
+        )
+        seq.append(ast.Expr(value=tmp_call))
+        seq.extend(vars)
+
+        body = seq
+        for generator in reversed(generators):
+            test = self._comp_test(generator.ifs)
+            if test is not None:
+                body = [ast.If(test=test, body=body, orelse=[])]
+            body = [
                 ast.For(
-                    target=generators[0].target,
-                    iter=generators[0].iter,
-                    body=[
-                        ast.If(
-                            test=self.combine_conditions(generators[0].ifs),
-                            body=self._visit_ListComp(
-                                tmp_name_node, elt, generators[1:]
-                            ),
-                            orelse=[],
-                        )
-                    ]
-                    if generators[0].ifs
-                    else self._visit_ListComp(tmp_name_node, elt, generators[1:]),
+                    target=generator.target,
+                    iter=generator.iter,
+                    body=body,
                     orelse=[],
                 )
             ]
+        return body
+
+    def _visit_ListComp(
+        self,
+        tmp_name_node: ast.Name,
+        elt: ast.expr,
+        generators: List[ast.comprehension],
+    ) -> Any:
+        return self._visit_Comp(tmp_name_node, elt, generators, "append")
 
     def visit_SetComp(self, node: ast.SetComp) -> VisitedExprRes:
         new_expr_sequence = []
@@ -1284,7 +1512,7 @@ class CFGVisitor(ast.NodeVisitor):
             ast.Assign(
                 targets=[tmp_name_node],
                 value=ast.Call(
-                    args=[], func=ast.Name(id="set", ctx=ast.Load()), keywords=[]
+                    args=[], func=_SET_NAME, keywords=[]
                 ),
             )
         )
@@ -1302,39 +1530,7 @@ class CFGVisitor(ast.NodeVisitor):
         elt: ast.expr,
         generators: List[ast.comprehension],
     ):
-        if not generators:
-            seq, name, vars = self.decompose_expr(elt)
-            tmp_call = ast.Call(
-                func=ast.Attribute(
-                    value=tmp_name_node,
-                    attr="add",
-                    ctx=ast.Load(),
-                ),
-                args=[name],
-                keywords=[],
-            )
-            seq.append(ast.Expr(value=tmp_call))
-            seq.extend(vars)
-            return seq
-        else:
-            return [
-                ast.For(
-                    target=generators[0].target,
-                    iter=generators[0].iter,
-                    body=[
-                        ast.If(
-                            test=self.combine_conditions(generators[0].ifs),
-                            body=self._visit_SetComp(
-                                tmp_name_node, elt, generators[1:]
-                            ),
-                            orelse=[],
-                        )
-                    ]
-                    if generators[0].ifs
-                    else self._visit_SetComp(tmp_name_node, elt, generators[1:]),
-                    orelse=[],
-                )
-            ]
+        return self._visit_Comp(tmp_name_node, elt, generators, "add")
 
     def visit_DictComp(self, node: ast.DictComp) -> Any:
         new_expr_sequence = []
@@ -1372,21 +1568,15 @@ class CFGVisitor(ast.NodeVisitor):
             resulted_sequence = seq1 + seq2 + [tmp_assign] + vars1 + vars2
             return resulted_sequence
         else:
+            body = self._visit_DictComp(dictcomp_var, key, value, generators[1:])
+            test = self._comp_test(generators[0].ifs)
+            if test is not None:
+                body = [ast.If(test=test, body=body, orelse=[])]
             return [
                 ast.For(
                     target=generators[0].target,
                     iter=generators[0].iter,
-                    body=[
-                        ast.If(
-                            test=self.combine_conditions(generators[0].ifs),
-                            body=self._visit_DictComp(
-                                dictcomp_var, key, value, generators[1:]
-                            ),
-                            orelse=[],
-                        )
-                    ]
-                    if generators[0].ifs
-                    else self._visit_DictComp(dictcomp_var, key, value, generators[1:]),
+                    body=body,
                     orelse=[],
                 )
             ]
@@ -1412,7 +1602,7 @@ class CFGVisitor(ast.NodeVisitor):
         )
         new_expr_sequence.append(
             ast.Call(
-                func=ast.Name(id=generator_var, ctx=ast.Load()), args=[], keywords=[]
+                func=ast.Name(id=generator_var, ctx=_LOAD), args=[], keywords=[]
             )
         )
 
@@ -1428,19 +1618,15 @@ class CFGVisitor(ast.NodeVisitor):
             seq.extend(vars)
             return seq
         else:
+            body = self._visit_GeneratorExp(elt, generators[1:])
+            test = self._comp_test(generators[0].ifs)
+            if test is not None:
+                body = [ast.If(test=test, body=body, orelse=[])]
             return [
                 ast.For(
                     target=generators[0].target,
                     iter=generators[0].iter,
-                    body=[
-                        ast.If(
-                            test=self.combine_conditions(generators[0].ifs),
-                            body=self._visit_GeneratorExp(elt, generators[1:]),
-                            orelse=[],
-                        )
-                    ]
-                    if generators[0].ifs
-                    else self._visit_GeneratorExp(elt, generators[1:]),
+                    body=body,
                     orelse=[],
                 )
             ]
@@ -1485,7 +1671,7 @@ class CFGVisitor(ast.NodeVisitor):
         return resulted_sequence, resulted_vars
 
     def visit_Call(self, node: ast.Call) -> VisitedExprRes:
-        if isinstance(node.func, ast.Lambda):
+        if type(node.func) is ast.Lambda:
             raise NotImplementedError(node.func)
 
         seq = []
@@ -1498,7 +1684,7 @@ class CFGVisitor(ast.NodeVisitor):
 
         # decompose args
         for idx, expr in enumerate(node.args):
-            if isinstance(expr, ast.Starred):
+            if type(expr) is ast.Starred:
                 starred_seq, starred_vars = self.visit(expr)
                 node.args[idx] = starred_seq[-1]
                 seq.extend(starred_seq[:-1])
@@ -1604,7 +1790,7 @@ class CFGVisitor(ast.NodeVisitor):
         tmp_name_node = TempVariableName.generate_name_node()
         temp_list_assign = ast.Assign(
             targets=[tmp_name_node],
-            value=ast.Call(func=ast.Name(id="list"), args=[], keywords=[]),
+            value=ast.Call(func=_LIST_NAME, args=[], keywords=[]),
         )
         seq.append(temp_list_assign)
         for idx, elt in enumerate(node.elts):
@@ -1627,7 +1813,7 @@ class CFGVisitor(ast.NodeVisitor):
         tmp_name_node = TempVariableName.generate_name_node()
         temp_list_assign = ast.Assign(
             targets=[tmp_name_node],
-            value=ast.Call(func=ast.Name(id="tuple"), args=[], keywords=[]),
+            value=ast.Call(func=_TUPLE_NAME, args=[], keywords=[]),
         )
         seq.append(temp_list_assign)
         for idx, elt in enumerate(node.elts):